@@ -11,8 +11,10 @@ FILES=$(echo "~/.go-cookies\tHolds  authentication  tokens  for communicating wi
 dir=$(dirname $0)
 $dir/generate-manpage.py -a 'https://jujucharms.com' -f "$FILES" -v "$VERSION" -t "$TITLE" charm
 
-for cmd in $(charm help | awk '{if (x==1) {print $1} if( $1=="commands:")x=1;} ') 
+subflags=""
+for cmd in $(charm help | awk '{if (x==1) {print $1} if( $1=="commands:")x=1;} ')
 do
-    $dir/generate-manpage.py -a 'https://jujucharms.com' -s "$cmd" -t "$TITLE" -v "$VERSION" charm
-
+    subflags="$subflags -s $cmd"
 done
+
+$dir/generate-manpage.py -a 'https://jujucharms.com' $subflags -t "$TITLE" -v "$VERSION" charm
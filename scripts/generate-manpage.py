@@ -10,8 +10,6 @@ import sys
 # Insert the directory that this module is in into the python path.
 sys.path.insert(0, (os.path.dirname(__file__)))
 
-from jujuman import JujuMan
-
 
 def main(argv):
     parser = ArgumentParser()
@@ -23,8 +21,9 @@ def main(argv):
     parser.add_argument("-o", "--output", dest="filename", metavar="FILE",
                         help="write output to FILE")
     parser.add_argument("-s", "--subcommand",
-                        dest="subcommand",
-                        help="write man page for subcommand")
+                        dest="subcommands", action="append",
+                        help="write man page for subcommand "
+                             "(may be given multiple times)")
     parser.add_argument("-t", "--title", dest="title",
                         help="set the title in generated man page")
     parser.add_argument("-v", "--version", dest="version",
@@ -38,24 +37,45 @@ def main(argv):
         parser.print_help()
         sys.exit(1)
 
-    doc_generator = JujuMan(options.utility,
-                            also=options.also,
-                            files=options.files,
-                            subcmd=options.subcommand,
-                            title=options.title,
-                            version=options.version)
+    subcommands = options.subcommands or [None]
+    if options.filename and len(subcommands) > 1:
+        parser.error("-o/--output cannot be used with multiple subcommands")
+
+    generate_all(options.utility, subcommands,
+                 also=options.also,
+                 files=options.files,
+                 title=options.title,
+                 version=options.version,
+                 filename=options.filename)
+
+
+def generate_all(utility, subcmds, also=None, files=None, title=None,
+                 version=None, filename=None):
+    """Writes a man page for each subcommand (None for the utility itself).
+
+    Generating all the pages from a single process lets jujuman reuse
+    help output it has already collected instead of spawning the same
+    subprocess once per page.
+    """
+    # Imported here rather than at module level so that parsing errors
+    # and --help don't pay for loading jujuman.
+    from jujuman import JujuMan
 
-    if options.filename:
-        outfilename = options.filename
-    else:
-        outfilename = doc_generator.get_filename()
+    for subcmd in subcmds:
+        doc_generator = JujuMan(utility,
+                                also=also,
+                                files=files,
+                                subcmd=subcmd,
+                                title=title,
+                                version=version)
 
-    if outfilename == "-":
-        outfile = sys.stdout
-    else:
-        outfile = open(outfilename, "w")
+        outfilename = filename or doc_generator.get_filename()
 
-    doc_generator.write_documentation(outfile)
+        if outfilename == "-":
+            doc_generator.write_documentation(sys.stdout)
+        else:
+            with open(outfilename, "w") as outfile:
+                doc_generator.write_documentation(outfile)
 
 
 if __name__ == "__main__":
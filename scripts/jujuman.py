@@ -3,6 +3,8 @@
 
 """Functions for generating the manpage using the juju command."""
 
+import functools
+import re
 import subprocess
 import time
 
@@ -23,138 +25,110 @@ class JujuMan:
         self.title = title
         self.version = version
 
-        self.filename = self.cmd + ('' if not self.subcmd
-                                    else '-' + self.subcmd) + '.1'
+        if self.subcmd:
+            self.filename = f"{self.cmd}-{self.subcmd}.1"
+        else:
+            self.filename = f"{self.cmd}.1"
 
     def get_filename(self):
         """Provides name of manpage"""
         return self.filename
 
     def run_help(self):
-        cmd = [self.cmd, 'help']
-        if self.subcmd:
-            cmd = [self.cmd, 'help', self.subcmd]
-        print('running '+' '.join(cmd))
-        return subprocess.check_output(cmd).strip()
+        return _run_help(self.cmd, self.subcmd)
 
     def help(self):
-        text = self.run_help()
-        # extcommands = self.run('help', 'plugins')
-        commands = []
-        known_states = ['commands:', 'summary:', 'options:', 'details:',
-                        'examples:']
-        states = {}
-        state = None
-        for line in text.decode("utf-8").split('\n'):
-            line = line.strip()
-            state = line.lower()
-            if state in known_states:
-                states[state] = ''
-                continue
-            if state == 'commands:':
-                s = line.split(' ', 1)
-                if len(s) > 1:
-                    name, short_help = s
-                else:
-                    continue
-                if 'alias for' in short_help:
-                    continue
-                short_help = short_help.lstrip('- ')
-                commands.append((name, short_help.strip()))
-                continue
-            if state in states:
-                states[state] += '\n' + line
-
-        states['options:'] = self.format_options(states.get('options:', None))
-        return (states.get('summary:', None),
-                states.get('options:', None),
-                states.get('details:', None),
-                states.get('examples:', None),
-                commands)
+        return _parsed_help(self.cmd, self.subcmd)
 
     def write_documentation(self, outfile):
         """Assembles a man page"""
-        t = time.time()
-        gmt = time.gmtime(t)
+        write = self._write_subcmd if self.subcmd else self._write_main
+        write(outfile)
+
+    def _write_main(self, outfile):
+        """Writes the page for the utility itself"""
+        params, esc, examples, commands = self._page_params('', ' ')
+        chunks = [man_preamble.format_map(params),
+                  _man_head_esc.format_map(esc),
+                  _man_syn_esc.format_map(esc),
+                  _man_desc_esc.format_map(esc)]
+        self._write_tail(outfile, chunks, esc, examples, commands)
+
+    def _write_subcmd(self, outfile):
+        """Writes the page for one subcommand"""
+        params, esc, examples, commands = self._page_params(
+            '-' + self.subcmd, self.subcmd)
+        chunks = [man_preamble.format_map(params),
+                  _man_head_esc.format_map(esc),
+                  _man_syn_sub_esc.format_map(esc),
+                  _man_desc_esc.format_map(esc)]
+        self._write_tail(outfile, chunks, esc, examples, commands)
+
+    def _page_params(self, hsubcmd, subcmd):
+        """Collects the template parameters for one page, plus the
+        examples and commands that steer the optional sections."""
+        gmt = time.gmtime(time.time())
+        datestamp = time.strftime("%Y-%m-%d", gmt)
         summary, options, details, examples, commands = self.help()
         params = {
             "cmd": self.cmd,
-            "datestamp": time.strftime("%Y-%m-%d", gmt),
+            "datestamp": datestamp,
             "description": details,
             "examples": examples,
             "files": self.files,
-            "hsubcmd": ('-' + self.subcmd) if self.subcmd else '',
+            "hsubcmd": hsubcmd,
             "options": options,
-            "subcmd": self.subcmd or ' ',
+            "subcmd": subcmd,
             "summary": summary,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S +0000", gmt),
+            "timestamp": datestamp + time.strftime(" %H:%M:%S +0000", gmt),
             "title": self.title,
             "version": self.version,
             }
-        outfile.write(man_preamble % params)
-        outfile.write(man_escape(man_head % params))
-        if self.subcmd:
-            outfile.write(man_escape(man_syn_sub % params))
-        else:
-            outfile.write(man_escape(man_syn % params))
-        outfile.write(man_escape(man_desc % params))
+        # Escaping is context-free per character, so escaping the values
+        # and formatting them into the pre-escaped templates matches
+        # escaping the formatted result.
+        esc = {k: man_escape(v) if isinstance(v, str) else v
+               for k, v in params.items()}
+        return params, esc, examples, commands
+
+    def _write_tail(self, outfile, chunks, esc, examples, commands):
+        """Appends the data-driven sections and writes the page"""
         if commands:
-            outfile.write(man_escape(
+            chunks.append(man_escape(
                 self.get_command_overview(self.cmd, commands)))
         if examples:
-            outfile.write(man_escape(man_examples % params))
-        sac = '.SH "SEE ALSO"\n'
+            chunks.append(_man_examples_esc.format_map(esc))
+        if _ENV_BLOCK:
+            chunks.append(_ENV_BLOCK)
+        if self.files:
+            chunks.append(man_escape(man_files + self.format_files()))
+        chunks.append('.SH "SEE ALSO"\n')
         if commands:
-            sac += "".join((r'\fB' + self.cmd + '-' + cmd + r'\fR(1), '
-                            for cmd, _ in commands))
+            chunks.extend(r'\fB' + self.cmd + '-' + cmd + r'\fR(1), '
+                          for cmd, _ in commands)
         else:
-            sac += r'\fB' + self.cmd + r'\fR(1), '
-        sac += '\n'
-        outfile.write("".join(environment_variables()))
-        if self.files:
-            outfile.write(man_escape(man_files + self.format_files()))
-        outfile.write(sac)
+            chunks.append(r'\fB' + self.cmd + r'\fR(1), ')
+        chunks.append('\n')
         if self.also:
-            outfile.write(man_escape(
+            chunks.append(man_escape(
                 ''.join('.UR {0}\n.BR {0}'.format(a) for a in
                         self.also.split('\t'))))
+        outfile.write(''.join(chunks))
 
     def get_command_overview(self, basecmd, commands):
         """Builds summary help for command names in manpage format"""
-        output = '.SH "COMMAND OVERVIEW"\n'
-        for cmd_name, short_help in commands:
-            tmp = '.TP\n.B "%s %s"\n%s\n' % (basecmd,
-                                             cmd_name, short_help)
-            output = output + tmp
-        return output
-
-    def format_options(self, options):
-        if not options:
-            return
-        olist = []
-        prev = None
-        for line in options.split('\n'):
-            if not line:
-                continue
-            if line.startswith('-'):
-                if prev:
-                    olist.append(prev)
-                prev = [line, '']
-                continue
-            prev = [prev[0], prev[1] + line]
-
-        return ''.join(('.PP\n' + c +
-                        '\n.RS 4\n' + d +
-                        '\n.RE\n' for c, d in olist))
+        parts = ['.SH "COMMAND OVERVIEW"\n']
+        parts.extend('.TP\n.B "%s %s"\n%s\n' % (basecmd, cmd_name, short_help)
+                     for cmd_name, short_help in commands)
+        return ''.join(parts)
 
     def format_files(self):
         if not self.files:
             return
-        files = self.files.split('\n')
-        return ''.join('''.TP
-.I "{}"
-{}
-'''.format(*line.split('\t', 1)) for line in files)
+        files = self.files.splitlines()
+        return ''.join('.TP\n.I "' + name + '"\n' + desc + '\n'
+                       for name, desc in
+                       (line.split('\t', 1) for line in files))
 
 
 ENVIRONMENT = (
@@ -191,16 +165,79 @@ ENVIRONMENT = (
 )
 
 
+@functools.lru_cache(maxsize=None)
+def _run_help(cmd, subcmd):
+    """Runs the help command, caching output so that generating several
+    man pages in one process spawns each help subprocess only once."""
+    args = [cmd, 'help']
+    if subcmd:
+        args.append(subcmd)
+    print('running '+' '.join(args))
+    return subprocess.check_output(args).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _parsed_help(cmd, subcmd):
+    """Parses the help output for (cmd, subcmd) into its man page
+    ingredients, cached so sibling pages generated in one process
+    parse each help text only once."""
+    text = _run_help(cmd, subcmd).decode("utf-8")
+    # extcommands = _run_help(cmd, 'plugins')
+    # _SECTION_RE.split alternates preamble, header, body, header,
+    # body, ... so pairing the odd and even tails assigns each
+    # section body to its header in one pass.
+    parts = _SECTION_RE.split(text)
+    states = {}
+    for header, body in zip(parts[1::2], parts[2::2]):
+        states[header.lower()] = '\n'.join(
+            line.strip() for line in body.strip().splitlines())
+
+    commands = []
+    for name, short_help in _COMMAND_RE.findall(states.get('commands:', '')):
+        if 'alias for' in short_help:
+            continue
+        commands.append((name, short_help.lstrip('- ').strip()))
+
+    return (states.get('summary:', None),
+            _format_options(states.get('options:', None)),
+            states.get('details:', None),
+            states.get('examples:', None),
+            commands)
+
+
+def _format_options(options):
+    if not options:
+        return
+    return ''.join('.PP\n%s\n.RS 4\n%s\n.RE\n' % (head, body.strip())
+                   for head, body in _OPT_RE.findall(options))
+
+
+# The help-output sections we recognise, and the regexes matching a
+# section header on a line of its own and a command line (name plus
+# short help) within the commands section.
+_KNOWN_STATES = frozenset((
+    'commands:', 'summary:', 'options:', 'details:', 'examples:'))
+_SECTION_RE = re.compile(
+    r'(?im)^\s*(%s)\s*$' % '|'.join(sorted(_KNOWN_STATES)))
+_COMMAND_RE = re.compile(r'^(\S+)\s+(.+)$', re.M)
+
+# An option block: a line starting with '-', followed by any number of
+# description lines that don't start with '-'.
+_OPT_RE = re.compile(r'^(-\S[^\n]*)\n?((?:(?!-).+\n?)*)', re.M)
+
+# All escapes applied in one scan; the backtick maps to the doubly
+# escaped form its escape would have received from the apostrophe
+# replacement in the sequential-replace version this replaces.
+_ESC_RE = re.compile(r"[\\`'\-]")
+_ESC_MAP = {'\\': '\\\\', '`': '\\\\*(Aq', "'": '\\*(Aq', '-': '\\-'}
+
+
 def man_escape(string):
     """Escapes strings for man page compatibility"""
-    result = string.replace("\\", "\\\\")
-    result = result.replace("`", "\\'")
-    result = result.replace("'", "\\*(Aq")
-    result = result.replace("-", "\\-")
-    return result
+    return _ESC_RE.sub(lambda m: _ESC_MAP[m.group(0)], string)
 
 
-def environment_variables():
+def _build_env_block():
     if ENVIRONMENT:
         yield ".SH \"ENVIRONMENT\"\n"
 
@@ -210,14 +247,19 @@ def environment_variables():
         yield man_escape(desc) + "\n"
 
 
+# The environment section is fixed at import time, so render it once
+# instead of walking the generator for every page.
+_ENV_BLOCK = ''.join(_build_env_block())
+
+
 man_preamble = """\
-.\\\"Man page for %(cmd)s
+.\\\"Man page for {cmd}
 .\\\"
 .\\\" Large parts of this file are autogenerated from the output of
-.\\\"     \"%(cmd)s help commands\"
-.\\\"     \"%(cmd)s help <cmd>\"
+.\\\"     \"{cmd} help commands\"
+.\\\"     \"{cmd} help <cmd>\"
 .\\\"
-.\\\" Generation time: %(timestamp)s
+.\\\" Generation time: {timestamp}
 .\\\"
 
 .ie \\n(.g .ds Aq \\(aq
@@ -225,45 +267,45 @@ man_preamble = """\
 """
 
 man_head = """\
-.TH %(cmd)s%(hsubcmd)s 1 "%(datestamp)s" "%(version)s" "%(title)s"
+.TH {cmd}{hsubcmd} 1 "{datestamp}" "{version}" "{title}"
 .SH "NAME"
-%(cmd)s%(hsubcmd)s -- %(summary)s
+{cmd}{hsubcmd} -- {summary}
 """
 
 man_syn = """\
 .SH "SYNOPSIS"
-.B "%(cmd)s %(subcmd)s"
+.B "{cmd} {subcmd}"
 .I "command"
 [
 .I "command_options"
 ]
 .br
-.B "%(cmd)s %(subcmd)s"
+.B "{cmd} {subcmd}"
 .B "help"
 .br
-.B "%(cmd)s %(subcmd)s"
+.B "{cmd} {subcmd}"
 .B "help"
 .I "command"
 """
 
 man_syn_sub = """\
 .SH "SYNOPSIS"
-.B "%(cmd)s %(subcmd)s"
+.B "{cmd} {subcmd}"
 [
 .I "options"
 ]
 .br
-.B "%(cmd)s %(subcmd)s"
+.B "{cmd} {subcmd}"
 .B "help"
 """
 
 man_desc = """\
 .SH "DESCRIPTION"
 
-%(description)s
+{description}
 .SH "OPTIONS"
 
-%(options)s
+{options}
 """
 
 # TODO: Support example section.
@@ -273,3 +315,12 @@ man_examples = """\
 man_files = """\
 .SH "FILES"
 """
+
+# The fixed template text never changes between renders, so escape it
+# once at import time; write_documentation then only escapes the
+# values interpolated into it.
+_man_head_esc = man_escape(man_head)
+_man_syn_esc = man_escape(man_syn)
+_man_syn_sub_esc = man_escape(man_syn_sub)
+_man_desc_esc = man_escape(man_desc)
+_man_examples_esc = man_escape(man_examples)